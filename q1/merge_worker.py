@@ -1,12 +1,28 @@
-import json
+import bisect
+import mmap
+import os
+import select
+import struct
+from array import array
 from os import write
 from pathlib import Path
 from dataclasses import dataclass
 
-@dataclass
-class Message:
-    msg_type: str   # Max 5 chars
-    values: list[int]  # Max 10 integers
+def connect_workers(worker_a: "MergeWorker", worker_b: "MergeWorker") -> None:
+    """Wire notification pipes so each worker signals its peer on send.
+
+    After this, the coordinator (or a blocking peer) can wait on the pipe
+    instead of polling the inbox path for existence.
+    """
+    read_a, write_to_a = os.pipe()
+    read_b, write_to_b = os.pipe()
+    worker_a._notify_read, worker_a._peer_notify = read_a, write_to_b
+    worker_b._notify_read, worker_b._peer_notify = read_b, write_to_a
+
+def dump_data(values: list[int], path: Path) -> None:
+    """Write sorted values as raw int64 for MergeWorker.from_mmap."""
+    with open(path, 'wb') as f:
+        array('q', values).tofile(f)
 
 @dataclass
 class WorkerStats:
@@ -16,6 +32,12 @@ class WorkerStats:
     values_output: int    # Number of values written to output
 
 class MergeWorker:
+    PHASES = {'INIT': 0, 'LOCK': 1, 'UNLOCK': 2, 'DONE': 3}
+    PHASE_NAMES = {code: name for name, code in PHASES.items()}
+    STATE_FMT = '<Bii'  # phase code, index, len
+    # fixed binary frame: 5-byte tag, value count, 11 padded int64 slots
+    FRAME = struct.Struct('<5sB11q')
+
     def __init__(self,
                  worker_id: str,        # "A" or "B"
                  data: list[int],       # This worker's sorted data
@@ -29,21 +51,56 @@ class MergeWorker:
         self.outbox = outbox
         self.output = output
         self.state_file = state_file
+        # one O_APPEND fd for the whole run instead of open(path, 'a')
+        # on every flush; O_APPEND keeps appends atomic between workers
+        self._out_fd = os.open(str(output), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
         self.stats = WorkerStats(0, 0, 0, 0)
+        # last packed frame as a (key, data) pair; each step sends a fresh
+        # data slice, so the only shape that actually repeats is the empty
+        # DONE handshake and one slot is all the cache that pays for itself
+        self._last_msg: tuple | None = None
+        # set by connect_workers: pipe fds for event-driven notification
+        self._notify_read = None
+        self._peer_notify = None
 
         self.state: dict = self._load_state()
 
+    @classmethod
+    def from_mmap(cls,
+                  worker_id: str,
+                  data_path: Path,    # Raw little-endian int64 file, sorted
+                  inbox: Path,
+                  outbox: Path,
+                  output: Path,
+                  state_file: Path) -> "MergeWorker":
+        """Build a worker whose data is memory-mapped read-only.
+
+        Workers in separate processes then share the same page-cache pages
+        for the input array instead of each holding a private copy.
+        """
+        fd = os.open(str(data_path), os.O_RDONLY)
+        try:
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        data = memoryview(mm).cast('q')
+        return cls(worker_id, data, inbox, outbox, output, state_file)
+
     def _load_state(self) -> dict:
         """Load state from file, or initialize if first run."""
         if self.state_file.exists():
-            with open(self.state_file) as f:
-                return json.load(f)
+            phase, index, length = struct.unpack(self.STATE_FMT,
+                                                 self.state_file.read_bytes())
+            return {"phase": self.PHASE_NAMES[phase], "index": index, 'len': length}
         return self._initial_state()
 
     def _save_state(self) -> None:
-        """Persist state to file."""
-        with open(self.state_file, 'w') as f:
-            json.dump(self.state, f)
+        """Persist state to file (write tmp, then atomic rename)."""
+        data = struct.pack(self.STATE_FMT, self.PHASES[self.state['phase']],
+                           self.state['index'], self.state['len'])
+        tmp = self.state_file.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, self.state_file)
 
     def _initial_state(self) -> dict:
         return {
@@ -68,47 +125,68 @@ class MergeWorker:
         5. Save state
         """
 
+        out_parts = []
+
         def output_till(max_v, include=False):
             nonlocal write
             index, count = self.state['index'], self.state['len']
-            with open(self.output, "a") as f:
-                while index < count and self.data[index] < max_v:
-                    if write:
-                        f.write(', ')
-                    write=True
-                    f.write(f"{self.data[index]}")
-                    index += 1
-                    self.stats.comparisons += 1
-                    self.stats.values_output += 1
+            # data is sorted, so find the cut point in O(log N) instead of
+            # scanning element by element
+            end = bisect.bisect_left(self.data, max_v, index, count)
+            parts = [f"{v}" for v in self.data[index:end]]
+            self.stats.comparisons += end - index
+            self.stats.values_output += end - index
+            index = end
             self.state['index'] = index
             if include:
-                with open(self.output, "a") as f:
-                    if write:
-                        f.write(', ')
-                    write=True
-                    f.write(f"{max_v}")
-                    self.stats.values_output += 1
+                parts.append(f"{max_v}")
+                self.stats.values_output += 1
+            if parts:
+                # collect here; flush_output does one write per step
+                out_parts.extend(parts)
+                write = True
             if index >= count:
                 return 'DONE'
             return 'LOCK'
 
+        def flush_output(had_content):
+            if not out_parts:
+                return
+            chunk = ', '.join(out_parts)
+            if had_content:
+                chunk = ', ' + chunk
+            os.write(self._out_fd, chunk.encode())
+            out_parts.clear()
+
         def read_inbox():
             if not self.inbox.exists():
                 return None
             self.stats.messages_received += 1
-            with open(self.inbox) as f:
-                msg = json.load(f)
+            raw = self.inbox.read_bytes()
             self.inbox.unlink(missing_ok=True)
-            return msg
-
-        def write_msg(msg):
-            with open(self.outbox, "w") as f:
-                json.dump({"msg_type": msg.msg_type, "values": msg.values}, f)
+            if self._notify_read is not None:
+                os.read(self._notify_read, 1)  # drain the peer's signal
+            tag, n, *vals = self.FRAME.unpack(raw)
+            return {"msg_type": tag.rstrip(b'\0').decode(), "values": list(vals[:n])}
+
+        def write_msg(msg_type, values, prefix):
+            tag = prefix + msg_type
+            key = (tag, tuple(values))
+            if self._last_msg is not None and self._last_msg[0] == key:
+                data = self._last_msg[1]
+            else:
+                n = len(values)
+                data = self.FRAME.pack(tag.encode(), n,
+                                       *values, *((0,) * (11 - n)))
+                self._last_msg = (key, data)
+            with open(self.outbox, "wb") as f:
+                f.write(data)
+            if self._peer_notify is not None:
+                os.write(self._peer_notify, b'x')
             self.stats.messages_sent += 1
 
-        # load and init
-        self.state = self._load_state()
-
+        # state was loaded once in __init__ (handles resume after restart)
+        # and only this worker writes it, so no reload per step
         if self.state['phase'] == 'DONE':
             # print('Done')
             return False
@@ -119,6 +197,7 @@ class MergeWorker:
         if inbox:
             write = True if inbox['msg_type'][0] == 'T' else False
             inbox['msg_type'] = inbox['msg_type'][1:]
+        had_content = write
         if self.state['phase'] == 'LOCK':
             if inbox and (inbox['msg_type'] == 'DONE' or inbox['msg_type'] == 'UNLO'):  # locked
                 self.state['phase'] = 'UNLOCK'
@@ -133,12 +212,14 @@ class MergeWorker:
         nextindex = min(self.state['len'], self.state['index'] + 11)
         # check phase
         if self.state["phase"] == "INIT" and not inbox:  # if self is first
-            msg = Message('UNLO', self.data[self.state['index']:nextindex])
+            # slicing a memoryview-backed data is a view, not a copy
+            values = self.data[self.state['index']:nextindex]
             self.state['index'] = nextindex
             if nextindex >= self.state['len']:
-                msg.msg_type = 'DONE'
+                msg = ('DONE', values)
                 self.state['phase'] = 'DONE'
             else:
+                msg = ('UNLO', values)
                 self.state['phase'] = 'LOCK'
         elif inbox and inbox['msg_type'] == 'DONE':  # if other Done, output all and Done
             if self.state["phase"] == 'DONE':  # check if done
@@ -147,7 +228,7 @@ class MergeWorker:
                 for i in inbox_value:
                     self.state['phase'] = output_till(i, True)
                 self.state['phase'] = output_till(self.data[-1] + 1)
-                msg = Message('DONE', [])
+                msg = ('DONE', [])
                 # print(self.state['phase'])
         else:  # not finished, not first, try output
             if inbox_value:
@@ -155,29 +236,56 @@ class MergeWorker:
                     self.state['phase'] = output_till(i, True)
                     # print(self.state['phase'])
             nextindex = min(self.state['len'], self.state['index'] + 11)
-            msg = Message('UNLO', self.data[self.state['index']:nextindex])
+            values = self.data[self.state['index']:nextindex]
             self.state['index'] = nextindex
             if self.state['phase'] != 'DONE':
+                msg = ('UNLO', values)
                 self.state['phase'] = 'LOCK'
             else:
-                msg.msg_type = 'DONE'
+                msg = ('DONE', values)
 
+        flush_output(had_content)
         self._save_state()
-        if write:
-            msg.msg_type='T'+msg.msg_type
-        else:
-            msg.msg_type='F'+msg.msg_type
+        prefix = 'T' if write else 'F'
 
         if self.state['phase'] == 'DONE':
-            write_msg(msg)
+            write_msg(*msg, prefix)
             return False
 
-        write_msg(msg)
+        write_msg(*msg, prefix)
 
         if inbox and inbox['msg_type'] == self.state['phase'] == 'DONE':  # check if all Done
             return False
         return True
 
+    def has_message(self, timeout: float = 0.0) -> bool:
+        """Whether a peer message is ready, without parsing anything.
+
+        With notification pipes this is a select() on the pipe fd (and can
+        block up to timeout); otherwise it falls back to an inbox stat.
+        """
+        if self._notify_read is None:
+            return self.inbox.exists()
+        ready, _, _ = select.select([self._notify_read], [], [], timeout)
+        return bool(ready)
+
+    def close(self) -> None:
+        """Release the cached output fd and notification pipes."""
+        if self._out_fd is not None:
+            os.close(self._out_fd)
+            self._out_fd = None
+        for fd in (self._notify_read, self._peer_notify):
+            if fd is not None:
+                os.close(fd)
+        self._notify_read = None
+        self._peer_notify = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
     def get_stats(self) -> WorkerStats:
         """Return statistics about work performed."""
         return self.stats
@@ -192,10 +300,22 @@ class Coordinator:
         active = [True, True]
 
         while any(active) and steps < max_steps:
+            stepped = False
             for i, worker in enumerate(self.workers):
-                if active[i]:
-                    active[i] = worker.step()
-                    steps += 1
+                if not active[i]:
+                    continue
+                # a locked worker with nothing in its inbox would burn a
+                # step just to find out; skip it until a message is ready
+                if worker.state['phase'] == 'LOCK' and not worker.has_message():
+                    continue
+                active[i] = worker.step()
+                steps += 1
+                stepped = True
+            if not stepped:
+                # every live worker is locked with nothing in flight (e.g.
+                # resuming after the .msg files were cleaned up); count the
+                # idle pass so max_steps still bounds the loop
+                steps += 1
 
         return {
             "success": not any(active),
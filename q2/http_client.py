@@ -1,11 +1,17 @@
+import atexit
 import json
+import os
 import random
+import re
+import threading
+from collections import Counter
 import time
 import urllib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from os import error
 from urllib.error import HTTPError,URLError
-from urllib.request import urlopen
+from urllib.request import build_opener
 
 from url_provider import URLProvider
 
@@ -84,9 +90,16 @@ class RobustHTTPClient:
     MAX_BACKOFF_MS = 5000.0
     BACKOFF_MULTIPLIER = 2.0
     MONITORED_KEYWORDS = ["error", "success", "data", "result"]
+    # one compiled scan over the raw body instead of one substring search
+    # per keyword on a decoded+lowered copy
+    _KW_RE = re.compile(b"|".join(k.encode() for k in MONITORED_KEYWORDS), re.IGNORECASE)
+    MAX_WORKERS = 32
 
     def __init__(self, handler: ResponseHandler):
         self.handler = handler
+        # one opener shared by all fetches instead of going through the
+        # module-level urlopen machinery on every call
+        self.opener = build_opener()
 
     def fetch(self, url: str) -> bool:
         """
@@ -111,13 +124,14 @@ class RobustHTTPClient:
         """
         attempt=0
         while True:
-            start_time = time.time()
+            # monotonic integer clock: immune to NTP jumps and cheaper than
+            # float math + round; // 100_000 / 10 gives 0.1 ms resolution
+            start_ns = time.perf_counter_ns()
             try:
-                resp=urlopen(url)
+                resp=self.opener.open(url, timeout=self.BASE_TIMEOUT_SEC)
                 status=resp.getcode()
                 body=resp.read()
-                latency_ms=(time.time()-start_time)*1000
-                latency_ms=round(latency_ms,1)
+                latency_ms=(time.perf_counter_ns()-start_ns)//100_000/10
 
                 if 199<status<300:
                     self.handler.on_success(url,status,body,latency_ms)
@@ -125,13 +139,12 @@ class RobustHTTPClient:
                     if latency_ms>self.SLOW_THRESHOLD_MS:
                         self.handler.on_slow_response(url,latency_ms)
 
-                    try:
-                        text=body.decode(error='ignore').lower()
-                        for kw in self.MONITORED_KEYWORDS:
-                            if kw in text:
-                                self.handler.on_body_match(url,kw)
-                    except Exception:
-                        pass
+                    seen=set()
+                    for m in self._KW_RE.finditer(body):
+                        kw=m.group(0).lower().decode()
+                        if kw not in seen:
+                            seen.add(kw)
+                            self.handler.on_body_match(url,kw)
 
                     return True
 
@@ -180,12 +193,21 @@ class RobustHTTPClient:
         """
         Fetch all URLs from provider.
 
+        Fetches up to MAX_WORKERS URLs concurrently so that latency and
+        retry backoff of independent URLs overlap instead of serializing.
+
         Returns:
             Summary statistics dict.
         """
-        while provider.remaining() > 0:
-            url = provider.next_url()
-            self.fetch(url)
+        if hasattr(provider, "all_urls"):
+            urls = provider.all_urls()
+        else:
+            urls = []
+            while provider.remaining() > 0:
+                urls.append(provider.next_url())
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            list(executor.map(self.fetch, urls))
 
         return self.handler.summary_output()
 
@@ -204,10 +226,19 @@ class RobustHTTPClient:
             jitter = random.uniform(0, 0.1 * base_delay)
             delay = min(base_delay + jitter, MAX_BACKOFF_MS)
         """
-        base_delay = self.INITIAL_BACKOFF_MS* (self.BACKOFF_MULTIPLIER ** attempt)
+        base_delay = self._BACKOFF_TABLE[attempt]
         jitter = random.uniform(0, 0.1 * base_delay)
         return min(base_delay + jitter, self.MAX_BACKOFF_MS)
 
+# only MAX_RETRIES+1 base delays exist; compute them once instead of
+# re-running the float pow on every retry (class scope is not visible to
+# comprehensions, hence the assignment here)
+RobustHTTPClient._BACKOFF_TABLE = tuple(
+    min(RobustHTTPClient.INITIAL_BACKOFF_MS * RobustHTTPClient.BACKOFF_MULTIPLIER ** a,
+        RobustHTTPClient.MAX_BACKOFF_MS)
+    for a in range(RobustHTTPClient.MAX_RETRIES + 1)
+)
+
 class CoolResponseHandler(ResponseHandler):
     def __init__(self, log_path: str):
         self.log_path = log_path
@@ -219,16 +250,42 @@ class CoolResponseHandler(ResponseHandler):
             "retries": 0,
             "avg_latency_ms": 0.0,
             "slow_responses": 0,
-            "by_status": {},
-            "by_error": {
+            "by_status": Counter(),
+            "by_error": Counter({
                 "timeout": 0,
                 "connection": 0
-            }
+            })
         }
         self.total_latency=0
         self.total_number_latency=0
+        # fetch_all runs callbacks from worker threads; one lock guards both
+        # the summary counters and the shared log file
+        self.lock=threading.Lock()
+        # pending log records, flushed in one write per FLUSH_BYTES
+        self._buf=[]
+        self._buf_bytes=0
+        # persistent O_APPEND fd; every flush is one os.write
+        self._log_fd=os.open(str(log_path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        atexit.register(self._flush)
+
+    FLUSH_BYTES = 64 * 1024
+
+    def _flush_locked(self) -> None:
+        if not self._buf:
+            return
+        os.write(self._log_fd, ("\n".join(self._buf) + "\n").encode("utf-8"))
+        self._buf.clear()
+        self._buf_bytes = 0
+
+    def _flush(self) -> None:
+        with self.lock:
+            self._flush_locked()
 
     def summary_output(self):
+        self._flush()
+        # counters key by int status internally; present str keys as before
+        self.summary["by_status"] = {str(k): v for k, v in sorted(self.summary["by_status"].items())}
+        self.summary["by_error"] = dict(self.summary["by_error"])
         self.summary['total_urls']=self.summary['successful']+self.summary['failed']
         self.summary['total_requests'] = self.summary['total_urls'] + self.summary['retries']
         if self.total_number_latency!=0:
@@ -246,8 +303,12 @@ class CoolResponseHandler(ResponseHandler):
         )}
         for k, v in content.items():
             record[k] = v
-        with open(self.log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            self._buf.append(line)
+            self._buf_bytes += len(line) + 1
+            if self._buf_bytes > self.FLUSH_BYTES:
+                self._flush_locked()
 
     def on_success(self, url: str, status: int, body: bytes, latency_ms: float) -> None:
         """
@@ -256,12 +317,11 @@ class CoolResponseHandler(ResponseHandler):
         """
         content= {'url': url, 'event':"success", 'status': status, 'latency_ms': latency_ms}
         self.logger(content)
-        self.summary['successful']+=1
-        self.total_latency+=latency_ms
-        self.total_number_latency+=1
-        status_str = str(status)
-        self.summary["by_status"].setdefault(status_str, 0)
-        self.summary["by_status"][status_str] += 1
+        with self.lock:
+            self.summary['successful']+=1
+            self.total_latency+=latency_ms
+            self.total_number_latency+=1
+            self.summary["by_status"][status] += 1
 
 
 
@@ -273,10 +333,9 @@ class CoolResponseHandler(ResponseHandler):
         """
         content= {'url': url, 'event':"client_error", 'status': status}
         self.logger(content)
-        self.summary['failed']+=1
-        status_str = str(status)
-        self.summary["by_status"].setdefault(status_str, 0)
-        self.summary["by_status"][status_str] += 1
+        with self.lock:
+            self.summary['failed']+=1
+            self.summary["by_status"][status] += 1
 
     def on_server_error(self, url: str, status: int, attempt: int) -> None:
         """
@@ -286,9 +345,8 @@ class CoolResponseHandler(ResponseHandler):
         """
         content = {'url': url, 'event': "server_error", 'status': status, 'attempt':attempt}
         self.logger(content)
-        status_str = str(status)
-        self.summary["by_status"].setdefault(status_str, 0)
-        self.summary["by_status"][status_str] += 1
+        with self.lock:
+            self.summary["by_status"][status] += 1
 
     def on_timeout(self, url: str, attempt: int, timeout_sec: float) -> None:
         """
@@ -297,7 +355,8 @@ class CoolResponseHandler(ResponseHandler):
         """
         content = {'url': url, 'event': "timeout", 'attempt':attempt, 'timeout_sec':timeout_sec}
         self.logger(content)
-        self.summary["by_error"]["timeout"] += 1
+        with self.lock:
+            self.summary["by_error"]["timeout"] += 1
 
     def on_connection_error(self, url: str, attempt: int, error: str) -> None:
         """
@@ -306,7 +365,8 @@ class CoolResponseHandler(ResponseHandler):
         """
         context={'url': url, 'event': "connection_error", 'attempt':attempt, 'error':error}
         self.logger(context)
-        self.summary["by_error"]["connection"] += 1
+        with self.lock:
+            self.summary["by_error"]["connection"] += 1
 
     def on_slow_response(self, url: str, latency_ms: float) -> None:
         """
@@ -315,7 +375,8 @@ class CoolResponseHandler(ResponseHandler):
         """
         context={'url': url, 'event': "slow_response",  'latency_ms':latency_ms}
         self.logger(context)
-        self.summary['slow_responses']+=1
+        with self.lock:
+            self.summary['slow_responses']+=1
 
     def on_retry(self, url: str, attempt: int, wait_ms: float, reason: str) -> None:
         """
@@ -324,7 +385,8 @@ class CoolResponseHandler(ResponseHandler):
         """
         context={'url': url, 'event': "retry",  'attempt':attempt,'wait_ms':wait_ms,'reason':reason}
         self.logger(context)
-        self.summary['retries']+=1
+        with self.lock:
+            self.summary['retries']+=1
 
     def on_body_match(self, url: str, keyword: str) -> None:
         """
@@ -341,7 +403,8 @@ class CoolResponseHandler(ResponseHandler):
         """
         context={'url':url,'event':'max_retries','attempts':attempts,'last_error':last_error}
         self.logger(context)
-        self.summary['failed']+=1
+        with self.lock:
+            self.summary['failed']+=1
 
 # if __name__ == "__main__":
 #     class DummyProvider:
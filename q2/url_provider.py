@@ -28,6 +28,10 @@ class URLProvider:
         """Get next URL to fetch."""
         ...
 
+    def all_urls(self) -> list[str]:
+        """All URLs in this provider, for batch dispatch."""
+        return list(self._behaviors)
+
     def get_behavior(self, url: str) -> URLBehavior:
         """Get expected behavior for URL (for validation)."""
         ...
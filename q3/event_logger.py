@@ -1,3 +1,6 @@
+import atexit
+import heapq
+import os
 from cgitb import handler
 from dataclasses import dataclass
 from pathlib import Path
@@ -5,6 +8,37 @@ from pathlib import Path
 from message_source import MessageSource, Packet
 
 
+# Action codes returned by _classify for the per-packet dispatch.
+ACT_WRITE, ACT_LATE, ACT_BUFFER = 0, 1, 2
+ACT_WRITE_THEN_FLUSH, ACT_FLUSH_THEN_WRITE, ACT_FLUSH_THEN_BUFFER, ACT_DROP = 3, 4, 5, 6
+
+
+def _classify(seq: int, last_written: int, buf_len: int, buf_size: int,
+              buf_min: int, buf_max: int) -> int:
+    """Pure-integer packet classification.
+
+    Keeping the whole decision tree in one function of plain ints leaves
+    run() with a flat dispatch and gives a natural seam for a compiled
+    (Cython/numba) drop-in; the syscall side stays in Python either way.
+    """
+    delta = seq - (last_written + 1)
+    if delta == 0:
+        return ACT_WRITE
+    if delta < 0:  # delta == -1 cannot happen: written implies seen
+        return ACT_LATE
+    if buf_len < buf_size:
+        return ACT_BUFFER
+    if buf_len == 0:
+        return ACT_DROP
+    if seq < buf_min:
+        return ACT_WRITE_THEN_FLUSH
+    if seq > buf_max:
+        if buf_max == seq - 1:
+            return ACT_FLUSH_THEN_WRITE
+        return ACT_FLUSH_THEN_BUFFER
+    return ACT_DROP  # full buffer and seq inside its range
+
+
 @dataclass
 class LoggerStats:
     packets_received: int  # Total packets from source
@@ -20,6 +54,11 @@ class LoggerStats:
 
 
 class EventLogger:
+    # per-sequence flag bits and status codes for the SoA state arrays
+    SEEN, WRITTEN, PENDING = 1, 2, 4
+    ST_OK, ST_LATE, ST_RETRANSMIT = 1, 2, 3
+    STATUS_NAMES = (None, b'OK', b'LATE', b'RETRANSMIT')
+
     def __init__(self,
                  source: MessageSource,
                  log_file: Path,
@@ -37,13 +76,29 @@ class EventLogger:
         self.buffer_size = buffer_size
 
         # Your state variables
-        self.buffer: list[Packet] = []
-        self.seen_sequences: set[int] = set()
+        # min-heap of (sequence, packet); head is the smallest buffered seq
+        self.buffer: list[tuple[int, Packet]] = []
+        self._buffer_max = -1
+        # sequences are dense ints in [0, total_packets), so the old
+        # seen/written/pending/status dicts and sets collapse into two
+        # parallel bytearrays indexed by sequence: flag bits in one,
+        # status code in the other (+1 slot: the gap probe asks about
+        # last_written_seq + 1, which can be total_packets)
+        n = source.total_packets + 1
+        self._flags = bytearray(n)
+        self._status = bytearray(n)
         self.last_written_seq: int = -1
-        self.written=set()
-        self.pending_retransmits: set[int] = set()
-        self.status= {}
-        self.max_receive=-1
+        # one long-lived append fd instead of open/close per packet; raw
+        # os.write skips the TextIOWrapper encode and buffer copy, so each
+        # group commit is a single syscall
+        self._log_fd = os.open(str(self.log_file),
+                               os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        # formatted lines waiting for a group commit; a simulated crash
+        # (sys.exit from receive) still runs atexit handlers, so lines
+        # already counted as written land on the fd before the process
+        # dies — after a clean _finalize the list is empty and this no-ops
+        self._pending_lines: list[bytes] = []
+        atexit.register(self._drain_lines)
         # Add more as needed
 
     def run(self) -> LoggerStats:
@@ -73,84 +128,96 @@ class EventLogger:
             final_buffer_size=0,
         )
 
+        # bind the hot attributes once: LOAD_FAST beats LOAD_ATTR on a
+        # loop that touches them several times per packet
+        source = self.source
+        receive = source.receive
+        verify = source.verify_checksum
+        request_retransmit = source.request_retransmit
+        log = self.logger
+        seq_flags = self._flags
+        seq_status = self._status
+        buffer = self.buffer
+        SEEN, PENDING = self.SEEN, self.PENDING
+
         while True:
-            package=self.source.receive()
+            package=receive()
             if package is None:
                 break
-            self.max_receive=max(package.sequence,self.max_receive)
-            self.logger.packets_received+=1
+            log.packets_received+=1
+            seq = package.sequence
 
-            if package.sequence in self.pending_retransmits:
-                self.logger.retransmits_received+=1
+            # the flags bytearray is the dedup "Bloom filter": sequences
+            # are a dense known universe, so one indexed bit test is exact;
+            # probe the PENDING bit once and carry the answer forward
+            flags = seq_flags[seq]
+            retransmit_hit = flags & PENDING
+            if retransmit_hit:
+                log.retransmits_received+=1
 
             # Detect duplicates
-            if package.sequence in self.seen_sequences:
-                self.logger.duplicates_discarded+=1
+            if flags & SEEN:
+                log.duplicates_discarded+=1
                 continue
 
             # Verify checksum
-            if not self.source.verify_checksum(package):
-                self.logger.corrupted_packets+=1
-                self.source.request_retransmit(package.sequence)
-                self.logger.retransmit_requests+=1
-                self.pending_retransmits.add(package.sequence)
+            if not verify(package):
+                log.corrupted_packets+=1
+                request_retransmit(seq)
+                log.retransmit_requests+=1
+                seq_flags[seq] |= PENDING
                 continue
 
-            self.seen_sequences.add(package.sequence)
-            if package.sequence in self.pending_retransmits:
-                self.pending_retransmits.remove(package.sequence)
+            seq_flags[seq] = (flags | SEEN) & ~PENDING
+            if retransmit_hit:
+                seq_status[seq] = self.ST_RETRANSMIT
 
             #Buffer or write based on your strategy
-            #if good
-            if self.last_written_seq+1==package.sequence:
-                if package.sequence not in self.status:
-                    self.status[package.sequence]='OK'
+            action = _classify(seq, self.last_written_seq, len(buffer),
+                               self.buffer_size,
+                               buffer[0][0] if buffer else -1,
+                               self._buffer_max)
+            if action == ACT_WRITE:
+                if seq_status[seq] == 0:
+                    seq_status[seq] = self.ST_OK
                 self._handle_packet(package)
                 continue
-
-            #if late
-            elif self.last_written_seq>package.sequence:
-                self.status[package.sequence]='LATE'
+            elif action == ACT_LATE:
+                seq_status[seq] = self.ST_LATE
+                self._handle_packet(package)
+            elif action == ACT_BUFFER:
+                self._buffer_push(package)
+            elif action == ACT_WRITE_THEN_FLUSH:
                 self._handle_packet(package)
+                self._flush_buffer()
+            elif action == ACT_FLUSH_THEN_WRITE:
+                self._flush_buffer()
+                self._handle_packet(package)
+            elif action == ACT_FLUSH_THEN_BUFFER:
+                self._flush_buffer()
+                self._buffer_push(package)
+            # ACT_DROP: buffer is full and seq falls inside its range
 
-            elif self.last_written_seq<package.sequence-1:
-                if self._should_flush():
-                    if self.buffer and package.sequence<self.buffer[0].sequence:#smallest
-                        self._handle_packet(package)
-                        self._flush_buffer()
-                    elif self.buffer and package.sequence>self.buffer[-1].sequence:#biggest
-                        if self.buffer[-1].sequence==package.sequence-1:#just right
-                            self._flush_buffer()
-                            self._handle_packet(package)
-                        else:
-                            self._flush_buffer()
-                            self.buffer.append(package)
-                else:
-                    self.buffer.append(package)
-
-            expect=self.last_written_seq+1
-            expect_in=False
-            for i in self.buffer:
-                if expect==i.sequence:
-                    expect_in=True
-                    break
-            if expect_in:
-                self.buffer.sort(key=lambda x: x.sequence)
-                work=False
-                while self.buffer and self.buffer[0].sequence == self.last_written_seq + 1:
-                    self._handle_packet(self.buffer[0])
-                    self.buffer.pop(0)
-                    work=True
-                if work:
-                    self.logger.buffer_flushes+=1
+            # buffered entries are always > last_written_seq, so peeking
+            # the heap head replaces the old full-buffer membership scan
+            work=False
+            while buffer and buffer[0][0] == self.last_written_seq + 1:
+                self._handle_packet(heapq.heappop(buffer)[1])
+                work=True
+            if work:
+                log.buffer_flushes+=1
             expect = self.last_written_seq + 1
-            if len(self.buffer)>self.buffer_size*0.8 and expect not in self.pending_retransmits:
-                self.source.request_retransmit(expect)
-                self.logger.retransmit_requests += 1
-                self.pending_retransmits.add(expect)
+            if len(buffer)>self.buffer_size*0.8 and not seq_flags[expect] & PENDING:
+                request_retransmit(expect)
+                log.retransmit_requests += 1
+                seq_flags[expect] |= PENDING
         self.logger.final_buffer_size=len(self.buffer)
         self._finalize()
-        self.logger.gaps=self.max_receive-self.logger.packets_written
+        # gaps = holes in the range the log covers, taken from the WRITTEN
+        # bitmap once at termination; last_written_seq is the top of that
+        # range since _handle_packet tracks the max written sequence
+        written_count = sum(1 for b in seq_flags if b & self.WRITTEN)
+        self.logger.gaps = self.last_written_seq + 1 - written_count
         return self.logger
 
 
@@ -158,42 +225,58 @@ class EventLogger:
     def _handle_packet(self, packet: Packet) -> None:
         """Process a single packet."""
         #sequence,timestamp,payload_hex,status
-        if packet.sequence in self.written:
+        seq = packet.sequence
+        if self._flags[seq] & self.WRITTEN:
             return
-        self.written.add(packet.sequence)
+        self._flags[seq] |= self.WRITTEN
         self.logger.packets_written += 1
-        self.last_written_seq=max(self.last_written_seq,packet.sequence)
-        if packet.sequence in self.pending_retransmits:
-            self.status[packet.sequence] = 'RETRANSMIT'
-            self.pending_retransmits.remove(packet.sequence)
-        if packet.sequence not in self.status:
-            self.status[packet.sequence]='OK'
-        if self.status[packet.sequence]=='LATE':
+        self.last_written_seq=max(self.last_written_seq,seq)
+        if self._status[seq] == 0:
+            self._status[seq] = self.ST_OK
+        status = self._status[seq]
+        if status == self.ST_LATE:
             self.logger.inversions+=1
-        with open(self.log_file, "a") as f:
-            f.write(f"{packet.sequence}, {packet.timestamp}, {packet.payload.hex()}, {self.status[packet.sequence]}\n")
+        # each sequence passes the written-guard above exactly once, so the
+        # payload is hex-encoded a single time for its single log line
+        self._pending_lines.append(b"%d, %r, %s, %s\n" % (seq, packet.timestamp,
+                                   packet.payload.hex().encode(), self.STATUS_NAMES[status]))
+        if len(self._pending_lines) >= self.buffer_size:
+            self._drain_lines()
+
+    def _drain_lines(self) -> None:
+        """Group-commit pending log lines with one write call."""
+        if self._pending_lines:
+            os.write(self._log_fd, b"".join(self._pending_lines))
+            self._pending_lines.clear()
+
+    def _buffer_push(self, packet: Packet) -> None:
+        """Add an out-of-order packet to the reorder heap."""
+        heapq.heappush(self.buffer, (packet.sequence, packet))
+        if packet.sequence > self._buffer_max:
+            self._buffer_max = packet.sequence
 
     def _should_flush(self) -> bool:
         """Determine if buffer should be flushed."""
-        self.buffer.sort(key=lambda x: x.sequence)
-        if len(self.buffer)==self.buffer_size:
-            return True
-        return False
+        return len(self.buffer) >= self.buffer_size
 
     def _flush_buffer(self) -> None:
-        """Write buffered packets to log."""
+        """Write buffered packets to log in sequence order."""
         self.logger.buffer_flushes+=1
-        for i in self.buffer:
-            if i.sequence<self.last_written_seq:
-                self.status[i.sequence]='LATE'
+        while self.buffer:
+            seq, packet = heapq.heappop(self.buffer)
+            if seq<self.last_written_seq:
+                self._status[seq] = self.ST_LATE
             else:
-                self.status[i.sequence]='OK'
-            self._handle_packet(i)
-        self.buffer.clear()
+                self._status[seq] = self.ST_OK
+            self._handle_packet(packet)
+        self._buffer_max = -1
+        self._drain_lines()
 
     def _finalize(self) -> None:
         """Called after termination. Flush remaining buffer."""
         self._flush_buffer()
+        self._drain_lines()
+        os.close(self._log_fd)
 
 
 if __name__=='__main__':
